@@ -1,161 +1,407 @@
-import sys
-import json
-import struct # Для упаковки целых чисел в байты
-from typing import List, Dict, Any
-
-# Определение опкодов (условно для примера)
-OPCODES = {
-    'load_const': 0x01,
-    'read': 0x02,
-    'write': 0x03,
-    'bswap': 0x04,
-    # ... другие команды ...
-}
-
-def parse_asm_line(line: str) -> Dict[str, Any]:
-    """Парсит одну строку, содержащую JSON-объект команды."""
-    try:
-        command_dict = json.loads(line.strip())
-        return command_dict
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Ошибка парсинга JSON: {e}")
-
-def translate_ir_to_machine_code(ir_list: List[Dict[str, Any]], output_file_path: str):
-    """
-    Преобразует список команд IR в машинный код и записывает в бинарный файл.
-    """
-    binary_data = bytearray()
-    for ir_cmd in ir_list:
-        opcode_name = ir_cmd.get('cmd')
-        args = ir_cmd.get('args', {})
-
-        if opcode_name not in OPCODES:
-            raise ValueError(f"Неизвестная команда '{opcode_name}' в IR.")
-
-        opcode = OPCODES[opcode_name]
-
-        # --- Трансляция в байты (гипотетический формат) ---
-        # load_const dst value
-        if opcode_name == 'load_const':
-            dst_reg = args.get('dst', 0)
-            value = args.get('value', 0)
-            # Упаковываем: opcode (1B), padding (4b), dst_reg (28b), value (32b)
-            # Используем little-endian ('<'), как часто делается.
-            # Для dst_reg: маска 0xFFFFFFF (28 бит), для value: 0xFFFFFFFF (32 бита)
-            # Упаковываем как 2 x 32-bit целых: [opcode + dst_part, value]
-            # opcode (8b) идет в младшие 8 бит первого слова
-            # dst_reg (28b) идет в старшие 28 бит первого слова
-            first_word = (dst_reg & 0xFFFFFFF) << 4 | (opcode & 0xFF)
-            second_word = value & 0xFFFFFFFF
-            binary_data.extend(struct.pack('<II', first_word, second_word))
-
-        # read dst src_addr
-        elif opcode_name == 'read':
-            dst_reg = args.get('dst', 0)
-            src_addr = args.get('src', 0)
-            first_word = (dst_reg & 0xFFFFFFF) << 4 | (opcode & 0xFF)
-            second_word = src_addr & 0xFFFFFFFF
-            binary_data.extend(struct.pack('<II', first_word, second_word))
-
-        # write addr src
-        elif opcode_name == 'write':
-            addr = args.get('addr', 0)
-            src_reg = args.get('src', 0)
-            # addr (32b) в первом слове, src_reg (28b) в старших 28 битах второго слова
-            first_word = addr & 0xFFFFFFFF
-            second_word = (src_reg & 0xFFFFFFF) << 4 | (opcode & 0xFF)
-            binary_data.extend(struct.pack('<II', first_word, second_word))
-
-        # bswap reg
-        elif opcode_name == 'bswap':
-            reg = args.get('dst', 0) # используем 'dst' для consistency с load_const
-            first_word = (reg & 0xFFFFFFF) << 4 | (opcode & 0xFF)
-            # Второе слово - резерв (нули)
-            second_word = 0
-            binary_data.extend(struct.pack('<II', first_word, second_word))
-
-        else:
-            raise ValueError(f"Команда '{opcode_name}' пока не реализована для трансляции в машинный код.")
-
-    # --- Запись в бинарный файл ---
-    try:
-        with open(output_file_path, 'wb') as bin_f:
-            bin_f.write(binary_data)
-    except Exception as e:
-        raise IOError(f"Ошибка при записи бинарного файла: {e}")
-
-def display_binary_file(file_path: str):
-    """
-    Считывает бинарный файл и выводит его содержимое в шестнадцатеричном виде.
-    """
-    try:
-        with open(file_path, 'rb') as bin_f:
-            data = bin_f.read()
-        if data:
-            hex_str = " ".join([f"0x{byte:02X}" for byte in data])
-            print(hex_str)
-        else:
-            print("(Файл пуст)")
-    except FileNotFoundError:
-        print(f"Ошибка: Бинарный файл {file_path} не найден для отображения.")
-    except Exception as e:
-        print(f"Ошибка при чтении бинарного файла для отображения: {e}")
-
-def assemble(input_file_path: str, output_file_path: str, test_mode: bool):
-    """
-    Основная функция ассемблера.
-    Читает .asm файл, строит промежуточное представление (IR),
-    транслирует IR в машинный код и записывает в .bin файл.
-    """
-    ir_list: List[Dict[str, Any]] = []
-
-    try:
-        with open(input_file_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                stripped_line = line.strip()
-                if not stripped_line or stripped_line.startswith('#'):
-                    continue
-
-                try:
-                    ir_cmd = parse_asm_line(stripped_line)
-                    if 'cmd' not in ir_cmd:
-                        print(f"Предупреждение (строка {line_num}): "
-                              f"'cmd' отсутствует в {ir_cmd}. Команда пропущена.")
-                        continue
-                    ir_list.append(ir_cmd)
-                except ValueError as e:
-                    print(f"Ошибка (строка {line_num}): {e}")
-                    return
-
-    except FileNotFoundError:
-        print(f"Ошибка: Файл {input_file_path} не найден.")
-        return
-    except Exception as e:
-        print(f"Ошибка при чтении файла: {e}")
-        return
-
-    # --- Вызов функции трансляции (Этап 2) ---
-    try:
-        translate_ir_to_machine_code(ir_list, output_file_path)
-        print(f"Ассемблировано команд: {len(ir_list)}")
-    except (ValueError, IOError) as e:
-        print(f"Ошибка трансляции в машинный код: {e}")
-        return # Прекращаем работу при ошибке трансляции
-
-    # --- Режим тестирования ---
-    if test_mode:
-        print("--- Начало байтового вывода (режим тестирования) ---")
-        display_binary_file(output_file_path)
-        print("--- Конец байтового вывода ---")
-
-
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python assembler.py <input.asm> <output.bin> [--test]")
-        sys.exit(1)
-
-    input_asm_file = sys.argv[1]
-    output_bin_file = sys.argv[2]
-    test_flag_present = '--test' in sys.argv
-
-    assemble(input_asm_file, output_bin_file, test_flag_present)
+import sys
+import struct # Для упаковки целых чисел в байты
+from typing import Dict, Any, Iterable, Iterator
+
+# orjson парсит JSON на уровне C в разы быстрее стандартного json;
+# при его отсутствии прозрачно откатываемся на стандартную библиотеку.
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+# NumPy позволяет кодировать команды пакетами: маски и сдвиги считаются
+# C-циклом по массивам, а не интерпретатором по одной команде.
+# Без NumPy работает обычный скалярный кодировщик.
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+# Numba компилирует ядро кодировщика в нативный код LLVM; компиляция
+# отложена до первого вызова и кэшируется на диске (cache=True), чтобы
+# не замедлять импорт и запуски на маленьких файлах.
+try:
+    from numba import njit as _njit, prange as _prange
+except ImportError:
+    _njit = None
+
+# Определение опкодов (условно для примера)
+OPCODES = {
+    'load_const': 0x01,
+    'read': 0x02,
+    'write': 0x03,
+    'bswap': 0x04,
+    # ... другие команды ...
+}
+
+# Общий пустой словарь для команд без 'args': подстановка готового
+# объекта вместо аллокации нового {} на каждую такую команду
+_EMPTY: Dict[str, Any] = {}
+
+# Формат '<II' компилируется один раз: методы Struct не разбирают строку
+# формата при каждом вызове, в отличие от модульного struct.pack
+_STRUCT_II = struct.Struct('<II')
+
+# Размер пакета записи: закодированные слова копятся в bytearray и
+# сбрасываются в файл такими порциями, а не по 8 байт на команду
+_OUT_CHUNK = 1 << 16
+
+# Размер буфера выходного файла (1 МиБ вместо стандартных ~8 КиБ):
+# меньше системных вызовов write на больших программах
+_OUT_BUFSIZE = 1 << 20
+
+# --- Кодировщики команд (гипотетический формат) ---
+# Каждая команда кодируется как 2 x 32-bit целых, little-endian ('<').
+# opcode (8b) идет в младшие 8 бит слова, регистр (28b) — в старшие 28 бит
+# (маска 0xFFFFFFF), операнд занимает целое слово (маска 0xFFFFFFFF).
+# Опкод «запечён» в кодировщик через аргумент по умолчанию, поэтому
+# на горячем пути не нужен ни поиск в OPCODES, ни цепочка if/elif.
+
+# load_const dst value
+def _enc_load_const(args, _op=OPCODES['load_const'] & 0xFF):
+    dst_reg = args.get('dst', 0)
+    value = args.get('value', 0)
+    return (dst_reg & 0xFFFFFFF) << 4 | _op, value & 0xFFFFFFFF
+
+# read dst src_addr
+def _enc_read(args, _op=OPCODES['read'] & 0xFF):
+    dst_reg = args.get('dst', 0)
+    src_addr = args.get('src', 0)
+    return (dst_reg & 0xFFFFFFF) << 4 | _op, src_addr & 0xFFFFFFFF
+
+# write addr src
+def _enc_write(args, _op=OPCODES['write'] & 0xFF):
+    # addr (32b) в первом слове, src_reg (28b) в старших 28 битах второго слова
+    addr = args.get('addr', 0)
+    src_reg = args.get('src', 0)
+    return addr & 0xFFFFFFFF, (src_reg & 0xFFFFFFF) << 4 | _op
+
+# bswap reg
+def _enc_bswap(args, _op=OPCODES['bswap'] & 0xFF):
+    reg = args.get('dst', 0) # используем 'dst' для consistency с load_const
+    # Второе слово - резерв (нули)
+    return (reg & 0xFFFFFFF) << 4 | _op, 0
+
+# Таблица диспетчеризации: одна выборка из словаря вместо цепочки сравнений
+ENCODERS = {
+    'load_const': _enc_load_const,
+    'read': _enc_read,
+    'write': _enc_write,
+    'bswap': _enc_bswap,
+}
+
+# Раскладка полей для векторного кодировщика:
+# (ключ регистра, ключ операнда, опкод во втором слове, опкод с маской).
+# У write опкод и регистр живут во втором слове, у остальных — в первом;
+# опкод, как и в кодировщиках выше, маскируется один раз при построении таблицы.
+_NP_LAYOUT = {
+    'load_const': ('dst', 'value', False, OPCODES['load_const'] & 0xFF),
+    'read': ('dst', 'src', False, OPCODES['read'] & 0xFF),
+    'write': ('src', 'addr', True, OPCODES['write'] & 0xFF),
+    'bswap': ('dst', None, False, OPCODES['bswap'] & 0xFF),
+}
+
+# Число команд в одном пакете векторного кодировщика (по 8 байт на
+# команду — 1 МиБ вывода на пакет): память остаётся ограниченной, а
+# пакет достаточно велик, чтобы окупались векторизация и параллелизм
+_NP_CHUNK = 1 << 17
+
+# Минимальный размер пакета для параллельного ядра: на мелких пакетах
+# накладные расходы на потоки съедают выигрыш
+_NP_PAR_MIN = 1 << 15
+
+if _np is not None and _njit is not None:
+    @_njit(cache=True)
+    def _encode_words_jit(regs, operands, opcodes, op_in_second, out):
+        # Сдвиг, маска и чередование слов одним нативным циклом,
+        # без промежуточных массивов numpy-выражений
+        for i in range(regs.size):
+            packed_reg = (regs[i] << 4) | opcodes[i]
+            if op_in_second[i]:
+                out[2 * i] = operands[i]
+                out[2 * i + 1] = packed_reg
+            else:
+                out[2 * i] = packed_reg
+                out[2 * i + 1] = operands[i]
+
+    @_njit(cache=True, parallel=True)
+    def _encode_words_jit_par(regs, operands, opcodes, op_in_second, out):
+        # Команды независимы, поэтому большой пакет кодируется
+        # параллельно по всем ядрам; каждый поток пишет свой срез out
+        for i in _prange(regs.size):
+            packed_reg = (regs[i] << 4) | opcodes[i]
+            if op_in_second[i]:
+                out[2 * i] = operands[i]
+                out[2 * i + 1] = packed_reg
+            else:
+                out[2 * i] = packed_reg
+                out[2 * i + 1] = operands[i]
+else:
+    _encode_words_jit = None
+    _encode_words_jit_par = None
+
+def _encode_chunk_np(chunk):
+    """
+    Кодирует пакет команд IR в байты машинного кода через NumPy.
+    Поля команд раскладываются по массивам uint32, после чего маски,
+    сдвиги и чередование слов выполняются векторно, с сохранением
+    исходного порядка команд.
+    """
+    n = len(chunk)
+    regs = _np.empty(n, dtype=_np.uint32)
+    operands = _np.empty(n, dtype=_np.uint32)
+    opcodes = _np.empty(n, dtype=_np.uint32)
+    op_in_second = _np.empty(n, dtype=_np.bool_)
+
+    for i, ir_cmd in enumerate(chunk):
+        opcode_name = ir_cmd.get('cmd')
+        layout = _NP_LAYOUT.get(opcode_name)
+        if layout is None:
+            raise ValueError(f"Неизвестная команда '{opcode_name}' в IR.")
+        reg_key, operand_key, in_second, masked_op = layout
+        args = ir_cmd.get('args') or _EMPTY
+        regs[i] = args.get(reg_key, 0) & 0xFFFFFFF
+        operands[i] = (args.get(operand_key, 0) & 0xFFFFFFFF) if operand_key else 0
+        opcodes[i] = masked_op
+        op_in_second[i] = in_second
+
+    if _encode_words_jit is not None:
+        # JIT-ядро: всё кодирование пакета — один нативный цикл;
+        # большие пакеты раскладываются по ядрам параллельной версией
+        out = _np.empty(2 * n, dtype=_np.uint32)
+        kernel = _encode_words_jit_par if n >= _NP_PAR_MIN else _encode_words_jit
+        kernel(regs, operands, opcodes, op_in_second, out)
+        # astype — no-op на little-endian платформах
+        return out.astype('<u4', copy=False).tobytes()
+
+    packed_reg = (regs << _np.uint32(4)) | opcodes
+    first_words = _np.where(op_in_second, operands, packed_reg)
+    second_words = _np.where(op_in_second, packed_reg, operands)
+
+    # Чередуем слова в выходном массиве little-endian uint32
+    out = _np.empty(2 * n, dtype='<u4')
+    out[0::2] = first_words
+    out[1::2] = second_words
+    return out.tobytes()
+
+def parse_asm_line(line: bytes) -> Dict[str, Any]:
+    """Парсит одну строку (сырые байты), содержащую JSON-объект команды."""
+    try:
+        command_dict = _loads(line)
+        return command_dict
+    except ValueError as e:
+        # json.JSONDecodeError и orjson.JSONDecodeError — подклассы ValueError
+        raise ValueError(f"Ошибка парсинга JSON: {e}")
+
+def iter_ir(input_file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Генератор: читает .asm файл построчно и выдаёт команды IR по одной.
+    Команды не накапливаются в список, поэтому память не зависит
+    от размера входного файла.
+
+    Файл читается в бинарном режиме: парсер JSON принимает байты напрямую
+    и игнорирует окружающие пробелы, так что ни декодирование UTF-8,
+    ни strip для каждой строки не нужны.
+
+    Файл открывается сразу при вызове, а не при первом next(): так
+    отсутствующий входной файл обнаруживается до того, как транслятор
+    создаст (и обнулит) выходной .bin файл.
+    """
+    f = open(input_file_path, 'rb')
+    return _iter_ir_lines(f)
+
+def _iter_ir_lines(f) -> Iterator[Dict[str, Any]]:
+    """Ленивая часть iter_ir: построчный разбор уже открытого файла."""
+    with f:
+        for line_num, raw in enumerate(f, 1):
+            stripped_line = raw.lstrip()
+            # Срез + сравнение дешевле вызова связанного метода startswith
+            if not stripped_line or stripped_line[:1] == b'#':
+                continue
+
+            try:
+                ir_cmd = parse_asm_line(raw)
+            except ValueError as e:
+                raise ValueError(f"Ошибка (строка {line_num}): {e}")
+
+            if 'cmd' not in ir_cmd:
+                print(f"Предупреждение (строка {line_num}): "
+                      f"'cmd' отсутствует в {ir_cmd}. Команда пропущена.")
+                continue
+
+            # Парсер JSON создаёт новую строку для каждого "cmd"; после
+            # интернирования поиск в таблицах диспетчеризации (их ключи —
+            # литералы, уже интернированные компилятором) сводится
+            # к сравнению указателей
+            cmd = ir_cmd['cmd']
+            if type(cmd) is str:
+                ir_cmd['cmd'] = sys.intern(cmd)
+
+            yield ir_cmd
+
+def translate_ir_to_machine_code(ir_commands: Iterable[Dict[str, Any]], output_file_path: str,
+                                 on_chunk=None) -> int:
+    """
+    Преобразует поток команд IR в машинный код и записывает в бинарный файл.
+    Принимает любой итерируемый объект и кодирует команды по мере поступления,
+    не материализуя весь список. Возвращает число ассемблированных команд.
+
+    on_chunk, если задан, вызывается с каждой записанной порцией байтов —
+    так режим тестирования получает машинный код без повторного чтения
+    файла. Порция действительна только на время вызова (буфер
+    переиспользуется), поэтому callback должен копировать её сразу.
+    """
+    count = 0
+    # pack_into пишет слова прямо в заранее выделенный буфер: в горячем
+    # цикле не создаётся ни одного промежуточного 8-байтового объекта
+    pack_into = _STRUCT_II.pack_into # локальный псевдоним: LOAD_FAST в цикле
+    buf = bytearray(_OUT_CHUNK)
+    buf_size = len(buf)
+    offset = 0
+    # Выходной файл открывается отдельно: любая ошибка здесь (включая
+    # отсутствующий каталог, т.е. FileNotFoundError) — это ошибка записи,
+    # и она не должна выглядеть как отсутствующий входной файл
+    try:
+        bin_f = open(output_file_path, 'wb', buffering=_OUT_BUFSIZE)
+    except OSError as e:
+        raise IOError(f"Ошибка при записи бинарного файла: {e}")
+
+    try:
+        with bin_f:
+            if _np is not None:
+                # Векторный путь: копим команды пакетами и кодируем
+                # каждый пакет одним проходом по массивам NumPy
+                chunk = []
+                chunk_append = chunk.append
+                for ir_cmd in ir_commands:
+                    chunk_append(ir_cmd)
+                    if len(chunk) == _NP_CHUNK:
+                        data = _encode_chunk_np(chunk)
+                        bin_f.write(data)
+                        if on_chunk is not None:
+                            on_chunk(data)
+                        count += len(chunk)
+                        chunk.clear()
+                if chunk:
+                    data = _encode_chunk_np(chunk)
+                    bin_f.write(data)
+                    if on_chunk is not None:
+                        on_chunk(data)
+                    count += len(chunk)
+                return count
+
+            for ir_cmd in ir_commands:
+                opcode_name = ir_cmd.get('cmd')
+                args = ir_cmd.get('args') or _EMPTY
+
+                enc = ENCODERS.get(opcode_name)
+                if enc is None:
+                    raise ValueError(f"Неизвестная команда '{opcode_name}' в IR.")
+
+                first_word, second_word = enc(args)
+                pack_into(buf, offset, first_word, second_word)
+                offset += 8
+                count += 1
+
+                # Порционный сброс: память остаётся ограниченной,
+                # а накладные расходы на запись амортизируются
+                if offset == buf_size:
+                    bin_f.write(buf)
+                    if on_chunk is not None:
+                        on_chunk(buf)
+                    offset = 0
+
+            if offset:
+                tail = memoryview(buf)[:offset]
+                bin_f.write(tail)
+                if on_chunk is not None:
+                    on_chunk(tail)
+    except ValueError:
+        raise
+    except OSError as e:
+        raise IOError(f"Ошибка при записи бинарного файла: {e}")
+
+    return count
+
+def display_bytes(data):
+    """
+    Выводит машинный код из буфера в памяти в шестнадцатеричном виде.
+    Форматирование идёт порциями, как в display_binary_file, но без
+    повторного чтения бинарного файла с диска.
+    """
+    if not data:
+        print("(Файл пуст)")
+        return
+    out_write = sys.stdout.write
+    view = memoryview(data)
+    for start in range(0, len(view), _OUT_CHUNK):
+        chunk = view[start:start + _OUT_CHUNK]
+        out_write(("0x" if start == 0 else " 0x")
+                  + chunk.hex(" ").upper().replace(" ", " 0x"))
+    print() # завершающий перевод строки
+
+def display_binary_file(file_path: str):
+    """
+    Считывает бинарный файл и выводит его содержимое в шестнадцатеричном виде.
+    """
+    try:
+        # Файл читается и форматируется порциями: память ограничена
+        # размером порции независимо от размера бинарника
+        empty = True
+        out_write = sys.stdout.write
+        with open(file_path, 'rb') as bin_f:
+            while chunk := bin_f.read(_OUT_CHUNK):
+                # bytes.hex реализован на C: без Python-цикла по байтам и без
+                # списка временных строк; префиксы '0x' добавляются одним replace
+                out_write(("0x" if empty else " 0x")
+                          + chunk.hex(" ").upper().replace(" ", " 0x"))
+                empty = False
+        if empty:
+            print("(Файл пуст)")
+        else:
+            print() # завершающий перевод строки, как у print(hex_str)
+    except FileNotFoundError:
+        print(f"Ошибка: Бинарный файл {file_path} не найден для отображения.")
+    except Exception as e:
+        print(f"Ошибка при чтении бинарного файла для отображения: {e}")
+
+def assemble(input_file_path: str, output_file_path: str, test_mode: bool):
+    """
+    Основная функция ассемблера.
+    Читает .asm файл, строит промежуточное представление (IR) в виде потока
+    и транслирует его в машинный код, записывая в .bin файл на лету.
+    """
+    # В режиме тестирования машинный код дополнительно копится в памяти,
+    # чтобы не перечитывать только что записанный .bin файл с диска
+    collected = bytearray() if test_mode else None
+
+    # --- Потоковая трансляция: парсер и кодировщик работают в одном проходе ---
+    try:
+        count = translate_ir_to_machine_code(
+            iter_ir(input_file_path), output_file_path,
+            on_chunk=collected.extend if test_mode else None)
+        print(f"Ассемблировано команд: {count}")
+    except FileNotFoundError:
+        print(f"Ошибка: Файл {input_file_path} не найден.")
+        return
+    except (ValueError, IOError) as e:
+        print(f"Ошибка трансляции в машинный код: {e}")
+        return # Прекращаем работу при ошибке трансляции
+
+    # --- Режим тестирования ---
+    if test_mode:
+        print("--- Начало байтового вывода (режим тестирования) ---")
+        display_bytes(collected)
+        print("--- Конец байтового вывода ---")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python assembler.py <input.asm> <output.bin> [--test]")
+        sys.exit(1)
+
+    input_asm_file = sys.argv[1]
+    output_bin_file = sys.argv[2]
+    test_flag_present = '--test' in sys.argv
+
+    assemble(input_asm_file, output_bin_file, test_flag_present)